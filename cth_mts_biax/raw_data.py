@@ -1,9 +1,46 @@
 """ Module for reading and compensating data from raw test files produced by the biaxial testing machine
 """
 
+import io
+
 import numpy as np
 
-    
+try:
+    import numba
+except ImportError:     # numba is optional, fall back to numpy implementations
+    numba = None
+
+try:
+    import pandas
+except ImportError:     # pandas is optional, fall back to np.loadtxt for file reading
+    pandas = None
+
+
+if numba is not None:
+    @numba.njit(parallel=True, cache=True)
+    def _comp_kernel(forc, torq, disp, rota, tstr, acnt, tcnt,
+                     has_disp, has_rota, has_tstr, has_acnt, has_tcnt,
+                     tstr_scale, inv_k_axial, inv_k_torsional, torque_per_force):
+        # Fused scaling, stiffness and cross-talk compensation: each row is loaded once and
+        # fully compensated before moving on, instead of one full pass per operation.
+        # Absent columns are passed as dummy arrays with their has_* flag set to False.
+        for i in numba.prange(forc.shape[0]):
+            f = forc[i]*1000.0
+            t = -1000.0*torq[i]
+            if has_disp:
+                disp[i] -= f*inv_k_axial
+            if has_rota:
+                rota[i] = -rota[i] - t*inv_k_torsional
+            if has_tstr:
+                tstr[i] *= tstr_scale
+            if has_acnt:
+                acnt[i] *= 2.0
+            if has_tcnt:
+                tcnt[i] *= 2.0
+            forc[i] = f
+            torq[i] = t - f*torque_per_force
+
+
 def read(name, min_num_columns=9, num_rows=0):
     """Read the raw experiment data file into a numpy array and include additional information from the header.
 
@@ -14,41 +51,52 @@ def read(name, min_num_columns=9, num_rows=0):
                             considered a data line
     :type min_num_columns: int
 
-    :param num_rows: How many rows to read. If 0, read all
+    :param num_rows: How many rows to read after the first data line, i.e. num_rows + 1
+                     rows in total. If 0, read all
     :type num_rows: int
 
     :returns: A np.array with test data and an information dictionary containing the test date (key='date')
     :rtype: tuple( np.array, dict )
 
-    If the file would have been formatted nicely, np.loadtxt() would be faster. The
-    comments at the top makes this a bit more difficult. The function detects
-    when the data starts by checking that the line converts into sufficient number
-    of floating point numbers. Thereafter, all lines are assumed to be data lines.
+    The comments at the top prevent using np.loadtxt() on the full file. The file is read into
+    memory once, and the function detects where the data starts by checking that a line converts
+    into sufficient number of floating point numbers. The remainder of the buffer is assumed to
+    be data lines and is parsed in one go by np.loadtxt (which parses in C, much faster than
+    converting line by line in python).
     """
 
     with open(name, 'r') as fid:
-        headers = []
-        data = []
-        num_rows = num_rows if num_rows != 0 else np.inf
-
-        for line in fid:
-            split_line = line.split()
-            try:
-                data_line = [float(item) for item in split_line]
-            except ValueError:
-                data_line = []  # Couldn't convert => not a data line
-            if len(data_line) >= min_num_columns:
-                data.append(data_line)
-                break
-            else:
-                headers.append(line)
-
-        row_nr = 1
-        for line in fid:
-            data.append([float(item) for item in line.split()])
-            row_nr += 1
-            if row_nr > num_rows:
-                break
+        content = fid.read()
+
+    # Scan the header line by line until the first data line is found; the data block
+    # is then a single slice of the in-memory buffer (no per-line allocations)
+    headers = []
+    data_start = None
+    pos = 0
+    while pos < len(content):
+        end = content.find('\n', pos)
+        end = len(content) if end == -1 else end
+        line = content[pos:end]
+        try:
+            data_line = [float(item) for item in line.split()]
+        except ValueError:
+            data_line = []  # Couldn't convert => not a data line
+        if len(data_line) >= min_num_columns:
+            data_start = pos
+            break
+        headers.append(content[pos:end + 1])
+        pos = end + 1
+
+    # The first data line plus num_rows additional rows, as the line-based reader returned
+    max_rows = None if num_rows == 0 else int(num_rows) + 1
+    if data_start is None:
+        data = np.array([])
+    elif pandas is not None:
+        # The pandas c-engine tokenizer is considerably faster than np.loadtxt
+        data = pandas.read_csv(io.StringIO(content[data_start:]), sep=r'\s+', header=None,
+                               dtype=np.float64, engine='c', nrows=max_rows).to_numpy()
+    else:
+        data = np.loadtxt(io.StringIO(content[data_start:]), dtype=np.float64, ndmin=2, max_rows=max_rows)
 
     info = {'date': 'not_found'}
     for hl in headers:
@@ -56,7 +104,7 @@ def read(name, min_num_columns=9, num_rows=0):
         if len(date_split) > 1:
             info['date'] = date_split[-1].strip()
 
-    return np.array(data), info
+    return data, info
 
 
 def compensate(data, cols, od, tstr_sign=0):
@@ -97,44 +145,65 @@ def compensate(data, cols, od, tstr_sign=0):
     # Other parameters
     ext_cal_dia = 10.0          # mm        The diameter for which the extensometer was calibrated.
 
+    # Extract each used column once as a contiguous copy; the strided column views
+    # force gather loads in every operation. Written back to data once at the end.
+    views = {key: np.ascontiguousarray(data[:, cols[key]]) for key in cols}
+
     # Automatically determine sign of shear strain scaling
     if tstr_sign == 0 and 'tstr' in cols:
         # Remove last 10 % when looking max min to avoid evaluating after failure.
         n = int(data.shape[0]*0.9)
+        torq = views['torq'][:n]
+        tstr = views['tstr'][:n]
         # Find max and min torque
-        i_max = np.argmax(data[:n, cols['torq']])
-        i_min = np.argmin(data[:n, cols['torq']])
+        i_max = np.argmax(torq)
+        i_min = np.argmin(torq)
         # Get sign of inclination for torque versus shear strain. If positive maintain sign versus torque.
-        tsgn = np.sign((data[i_max, cols['torq']] - data[i_min, cols['torq']]) /
-                       (data[i_max, cols['tstr']] - data[i_min, cols['tstr']]))
+        tsgn = np.sign((torq[i_max] - torq[i_min]) / (tstr[i_max] - tstr[i_min]))
     else:
         tsgn = tstr_sign
 
-    # Scale channels
-    scale_factors = {'forc': 1000.0,    # Convert from kN to N
-                     'torq': -1000.0,   # Convert from kNmm to Nmm and switch sign
-                     'rota': -1.0,      # Reverse rotation direction
-                     'tstr': -tsgn*ext_cal_dia/od,   # Reverse strain and compensate for different outer diameter.
-                     'tcnt': 2,         # Counters in half step, double to make integers
-                     'acnt': 2,
-                     }
-    for key in scale_factors:
-        if key in cols:
-            data[:, cols[key]] = scale_factors[key]*data[:, cols[key]]
-
-    # Compensate for machine stiffness
-    if 'disp' in cols:
-        data[:, cols['disp']] -= data[:, cols['forc']]/k_axial
-    if 'rota' in cols:
-        data[:, cols['rota']] -= data[:, cols['torq']]/k_torsional
+    tstr_scale = -tsgn*ext_cal_dia/od   # Reverse strain and compensate for different outer diameter.
+
+    if numba is not None:
+        # Single fused multicore pass over the rows
+        dummy = views['forc']
+        _comp_kernel(views['forc'], views['torq'],
+                     views.get('disp', dummy), views.get('rota', dummy), views.get('tstr', dummy),
+                     views.get('acnt', dummy), views.get('tcnt', dummy),
+                     'disp' in views, 'rota' in views, 'tstr' in views, 'acnt' in views, 'tcnt' in views,
+                     tstr_scale, 1.0/k_axial, 1.0/k_torsional, torque_per_force)
+    else:
+        # Scale channels
+        scale_factors = {'forc': 1000.0,    # Convert from kN to N
+                         'torq': -1000.0,   # Convert from kNmm to Nmm and switch sign
+                         'rota': -1.0,      # Reverse rotation direction
+                         'tstr': tstr_scale,
+                         'tcnt': 2,         # Counters in half step, double to make integers
+                         'acnt': 2,
+                         }
+        for key in scale_factors:
+            if key in views:
+                np.multiply(views[key], scale_factors[key], out=views[key])
+
+        # Compensate for machine stiffness (multiply by reciprocal stiffness, subtract in place)
+        if 'disp' in views:
+            views['disp'] -= views['forc']*(1.0/k_axial)
+        if 'rota' in views:
+            views['rota'] -= views['torq']*(1.0/k_torsional)
+
+        # Compensate for cross talk
+        views['torq'] -= views['forc']*torque_per_force
+
     stiffness_comp = ''
     if all([c in cols for c in ['disp', 'rota']]):
         stiffness_comp = ('Machine stiffness compensation:\n'
                           + ' disp = disp - forc * ({:0.6e} mm/N)\n'.format(1/k_axial)
                           + ' rota = rota - torq * ({:0.6e} rad/Nmm)\n'.format(1/k_torsional))
 
-    # Compensate for cross talk
-    data[:, cols['torq']] -= data[:, cols['forc']]*torque_per_force
+    # Write the compensated columns back into the data matrix
+    for key in views:
+        data[:, cols[key]] = views[key]
 
     info = (''
             + 'Rotation (torq,rota) reversed from machine\n'
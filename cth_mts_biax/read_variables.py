@@ -13,7 +13,7 @@ information in a dictionary format. Two output types are possible:
 
 """
 
-from defusedxml import minidom
+from defusedxml import ElementTree
 import numpy as np
 
 
@@ -40,27 +40,33 @@ def var_list_to_dicts(var_list):
     :rtype: tuple( dict )
     """
 
-    data = {}
+    # First pass: count the number of writes per variable, so the output arrays
+    # can be allocated to their final size up front
+    counts = {}
     unit = {}
-    inds = {}
-    for i, item in enumerate(var_list):
+    for item in var_list:
         for key in item:
-            if key not in data:
+            if key not in counts:
+                counts[key] = 0
                 unit[key] = item[key][1]     # unit
-                data[key] = []
-                inds[key] = []
-            if len(item[key][0]) == 1:
-                data[key].append(item[key][0][0])
-            else:
-                data[key].append(item[key][0])
-            inds[key].append(i)
+            counts[key] += 1
+
+    data = {key: np.empty(counts[key], dtype=object) for key in counts}
+    inds = {key: np.empty(counts[key], dtype=int) for key in counts}
+    filled = {key: 0 for key in counts}
+    for i, item in enumerate(var_list):
+        for key in item:
+            values = item[key][0]
+            data[key][filled[key]] = values[0] if len(values) == 1 else values
+            inds[key][filled[key]] = i
+            filled[key] += 1
 
     for key in data:
-        inds[key] = np.array(inds[key])
         try:
-            data[key] = np.array(data[key])
+            # Tighten to a numeric array when possible
+            data[key] = np.asarray(data[key].tolist())
         except ValueError:
-            pass
+            data[key] = data[key].tolist()  # Ragged data, keep as a list as before
 
     return data, unit, inds
 
@@ -75,55 +81,43 @@ def get_variable_list(file):
               the variables written that time the "Save variable to file"
               function was called in the test program. The keys in the 
               dictionary are the variable names, and each dict contains
-              tuple with a data list (often a single element) followed
-              by a string describing the unit
+              tuple with the data (a numpy array for numeric values,
+              otherwise a list of strings, often a single element)
+              followed by a string describing the unit
     :rtype: list[ dict ]
     """
     xml_file = file if file.endswith('.xml') else file + '.xml'
-    xml_doc = minidom.parse(xml_file)
-    # Get each instance where data has been written to the xml file
-    write_instances = xml_doc.getElementsByTagName('ArrayOfVariableData')
+    # Stream the file with iterparse, handling each instance where data has been written to the
+    # xml file as soon as its end tag is seen. This avoids building the full document in memory.
     var_list = []
-    for write_instance in write_instances:
-        var_list.append(_get_dict(write_instance))
+    for _, elem in ElementTree.iterparse(xml_file, events=("end",)):
+        if elem.tag == 'ArrayOfVariableData':
+            var_list.append(_get_dict(elem))
+            elem.clear()    # Release the processed subtree
 
     return var_list
 
 
 def _get_dict(write_instance):
-    written_variables = write_instance.getElementsByTagName('VariableData')
     var_dict = {}
-    for written_variable in written_variables:
-        name = written_variable.getElementsByTagName('Name')[0].firstChild.data
-        try:
-            unit = written_variable.getElementsByTagName('Unit')[0].firstChild.data
-        except IndexError:
-            unit = ''
-        values = _get_values(written_variable.getElementsByTagName('Values')[0])
+    for written_variable in write_instance.iterfind('VariableData'):
+        name = written_variable.findtext('Name')
+        unit = written_variable.findtext('Unit') or ''
+        values = _convert_values([value.text for value in written_variable.iterfind('Values/Value')])
         var_dict[name] = (values, unit)
 
     return var_dict
 
 
-def _get_values(values_element):
-    value_elements = values_element.getElementsByTagName('Value')
-    values = []
-    for value_element in value_elements:
-        values.append(value_element.firstChild.data)
-
-    _convert_values(values)
-
-    return values
-
-
 def _convert_values(values):
-
+    # Convert the list of strings in a single C-level parse: int64 when all values are
+    # integer strings (exact also above 2**53, and "4.0" stays float as before), falling
+    # back to float64, and to the string list as-is if the values are not numeric.
+    try:
+        return np.asarray(values, dtype=np.int64)
+    except (ValueError, OverflowError):
+        pass
     try:
-        tmp = [int(v) for v in values]
+        return np.asarray(values, dtype=np.float64)
     except ValueError:
-        try:
-            tmp = [float(v) for v in values]
-        except ValueError:
-            tmp = values
-
-    values[:] = tmp
+        return values
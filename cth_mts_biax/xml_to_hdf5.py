@@ -5,10 +5,68 @@ internally to store the testing data. That file can be found in the test folder:
 """
 import sys
 import os
+import re
+import mmap
+import queue
+import threading
 
 import numpy as np
 import h5py
 
+# Precompiled patterns for the signal description lines. Signals are keyed by the
+# InternalName attribute (the machine's internal key, which reduce_data and
+# reduced_signal_names expect), falling back to Name when it is absent.
+_SIGNAL_TAG_RE = re.compile(r'<Signal [^>]*')
+_INTERNAL_NAME_RE = re.compile(r'InternalName="([^"]*)"')
+_NAME_RE = re.compile(r'(?<!Internal)Name="([^"]*)"')
+_UNIT_RE = re.compile(r'Unit="([^"]*)"')
+# Data-section pattern: group(1) holds the value text, or None for a scan separator
+_DATA_RE = re.compile(rb"<Value>([^<]*)</Value>|<Scan>")
+
+try:
+    from lxml import etree
+except ImportError:     # lxml is optional, fall back to the line-based parser
+    etree = None
+
+try:
+    import numba
+except ImportError:     # numba is optional, fall back to numpy implementations
+    numba = None
+
+
+if numba is not None:
+    @numba.njit(cache=True)
+    def _find_cnt_changes(cnt, tol):
+        # Single fused pass over the counter array, avoiding the shifted-slice
+        # temporaries of the equivalent numpy expression
+        out = np.empty(cnt.size, dtype=np.int64)
+        num_found = 0
+        for i in range(cnt.size - 1):
+            if cnt[i + 1] > cnt[i] + tol:
+                out[num_found] = i
+                num_found += 1
+        return out[:num_found]
+    @numba.njit(cache=True)
+    def _find_cnt_changes_sum(cnt_a, cnt_b, tol):
+        # Change detection on the joined counter cnt_a + cnt_b, fused so that
+        # the summed counter array is never materialized
+        out = np.empty(cnt_a.size, dtype=np.int64)
+        num_found = 0
+        for i in range(cnt_a.size - 1):
+            if cnt_a[i + 1] + cnt_b[i + 1] > cnt_a[i] + cnt_b[i] + tol:
+                out[num_found] = i
+                num_found += 1
+        return out[:num_found]
+else:
+    def _find_cnt_changes(cnt, tol):
+        # np.diff does the shifted subtraction in one pass with a single temporary,
+        # instead of broadcasting cnt[:-1] + tol into an extra full-size array
+        return np.flatnonzero(np.diff(cnt) > tol)
+
+    def _find_cnt_changes_sum(cnt_a, cnt_b, tol):
+        # diff(a + b) == diff(a) + diff(b), so the full-size summed counter is never allocated
+        return np.flatnonzero(np.diff(cnt_a) + np.diff(cnt_b) > tol)
+
 
 def main(argv):
     if len(argv) < 2:
@@ -17,13 +75,14 @@ def main(argv):
         return
     file = argv[1]
     outer_diameter = float(argv[2])
-    rdata, runits = get_data(file)
+    rdata, runits = get_data(file, signals=reduced_signal_names())
     data, units, dtypes = reduce_data(rdata, runits)
     comp_data, comp_units, comp_attributes = compensate(data, units, outer_diameter)
     save_data(file, comp_data, comp_units, dtypes, global_attributes=comp_attributes)
 
 
-def save_data(file, data, units, dtypes=None, global_attributes=None):
+def save_data(file, data, units, dtypes=None, global_attributes=None,
+              compression='lzf', compression_opts=None, chunk_bytes=1048576):
     """Save data to hdf5 file for later use
 
     :param file: Path to hdf file to save data to, excluding .hdf suffix
@@ -41,21 +100,174 @@ def save_data(file, data, units, dtypes=None, global_attributes=None):
     :param global_attributes: Attributes to add the the top level
     :type global_attributes: dict
 
+    :param compression: Compression filter for floating point datasets. Defaults to 'lzf'
+                        (fast); 'gzip' gives smaller files at a higher cpu cost
+    :type compression: str
+
+    :param compression_opts: Options for the compression filter (e.g. the gzip level)
+    :type compression_opts: int
+
+    :param chunk_bytes: Target chunk size in bytes, around 1 MB is the hdf5 sweet spot
+    :type chunk_bytes: int
+
+    The datasets are saved chunked and compressed with the shuffle filter, which reduces
+    the file size considerably for slowly varying sensor data. Integer (counter index)
+    datasets always use gzip, which compresses their small deltas much harder, and
+    datasets below 64 kB are stored contiguously since chunking only adds overhead there.
     """
     dtypes_ = {} if dtypes is None else dtypes
     fname = file if file.endswith('.hdf') else file + '.hdf'
-    with h5py.File(fname, 'w') as hdf:
+    # Cast up front (h5py then compresses the already converted buffers) and find the
+    # largest chunk that will actually be written, which sets the file page size below
+    converted = {}
+    max_chunk_bytes = 0
+    for name in data:
+        values = np.asarray(data[name])
+        if name in dtypes_:
+            values = values.astype(dtypes_[name], copy=False)
+        converted[name] = values
+        if values.nbytes >= 65536:
+            chunk_len = max(1, min(len(values), chunk_bytes // values.dtype.itemsize))
+            max_chunk_bytes = max(max_chunk_bytes, chunk_len * values.dtype.itemsize)
+    if max_chunk_bytes > 0:
+        try:
+            # "Page" file-space allocation groups the metadata into aligned pages sized to
+            # hold the largest chunk, which gives faster writes and much faster random/remote
+            # reads. The large chunk cache (rdcc_nbytes) helps when rewriting compressed chunks.
+            hdf_file = h5py.File(fname, 'w', libver='latest', fs_strategy='page',
+                                 fs_page_size=max(4096, max_chunk_bytes), rdcc_nbytes=16*1024*1024)
+        except TypeError:
+            # Older h5py/hdf5 without page allocation support
+            hdf_file = h5py.File(fname, 'w')
+    else:
+        # Only small contiguous datasets: paged allocation would just pad the file
+        hdf_file = h5py.File(fname, 'w')
+    with hdf_file as hdf:
         for name in data:
-            if name in dtypes_:
-                ds = hdf.create_dataset(name, data=data[name], dtype=dtypes_[name])
+            values = converted[name]
+            if values.nbytes < 65536:
+                ds = hdf.create_dataset(name, data=values)
             else:
-                ds = hdf.create_dataset(name, data=data[name])
-            ds.attrs["unit"] = units[name]
+                chunk_len = max(1, min(len(values), chunk_bytes // values.dtype.itemsize))
+                if values.dtype.kind in 'iu':
+                    ds = hdf.create_dataset(name, data=values, chunks=(chunk_len,),
+                                            compression='gzip', compression_opts=4, shuffle=True)
+                else:
+                    ds = hdf.create_dataset(name, data=values, chunks=(chunk_len,),
+                                            compression=compression, compression_opts=compression_opts,
+                                            shuffle=True)
+            # Fixed-length ascii strings avoid the per-attribute heap object that h5py's
+            # default variable-length utf-8 serialization costs
+            ds.attrs["unit"] = np.bytes_(str2ascii(units[name]))
         if global_attributes is not None:
             for key in global_attributes:
-                hdf.attrs[key] = global_attributes[key]
-    return fname 
+                value = global_attributes[key]
+                hdf.attrs[key] = np.bytes_(str2ascii(value)) if isinstance(value, str) else value
+    return fname
+
+
+
+class _StreamWriter:
+    # Incremental hdf5 writer returned by open_writer. The datasets are created
+    # resizable on the first append of each signal and extended chunk by chunk.
+    def __init__(self, hdf, units, dtypes, compression, compression_opts, chunk_bytes):
+        self._hdf = hdf
+        self._units = units
+        self._dtypes = {} if dtypes is None else dtypes
+        self._compression = compression
+        self._compression_opts = compression_opts
+        self._chunk_bytes = chunk_bytes
+        self._dsets = {}
+
+    def append(self, data):
+        """ Append a chunk: a dictionary mapping signal names to numpy arrays """
+        for name in data:
+            values = np.asarray(data[name])
+            if name in self._dtypes:
+                values = values.astype(self._dtypes[name], copy=False)
+            values = np.ascontiguousarray(values)
+            ds = self._dsets.get(name)
+            if ds is None:
+                chunk_len = max(1, self._chunk_bytes // values.dtype.itemsize)
+                if values.dtype.kind in 'iu':
+                    ds = self._hdf.create_dataset(name, shape=(0,), maxshape=(None,),
+                                                  dtype=values.dtype, chunks=(chunk_len,),
+                                                  compression='gzip', compression_opts=4, shuffle=True)
+                else:
+                    ds = self._hdf.create_dataset(name, shape=(0,), maxshape=(None,),
+                                                  dtype=values.dtype, chunks=(chunk_len,),
+                                                  compression=self._compression,
+                                                  compression_opts=self._compression_opts, shuffle=True)
+                ds.attrs["unit"] = np.bytes_(str2ascii(self._units[name]))
+                self._dsets[name] = ds
+            row_start = ds.shape[0]
+            ds.resize((row_start + len(values),))
+            ds.write_direct(values, np.s_[0:len(values)], np.s_[row_start:row_start + len(values)])
+
+    def close(self):
+        """ Close the underlying hdf5 file """
+        self._hdf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_writer(file, units, dtypes=None, global_attributes=None,
+                compression='lzf', compression_opts=None, chunk_bytes=1048576):
+    """ Open an hdf5 file for incremental (streaming) writing of data chunks.
+
+    The counterpart of :py:func:`save_data` for pipelines built on :py:func:`iter_data`:
+    instead of one call with the complete arrays, chunks are handed to the returned
+    writer one at a time and appended to resizable datasets, so the full dataset never
+    has to be held in memory::
+
+        chunks = iter_data(xml_file)
+        names, units = next(chunks)
+        with open_writer(hdf_file, units) as writer:
+            for row_offset, data in chunks:
+                writer.append(data)
+
+    :param file: Path to hdf file to save data to, excluding .hdf suffix
+    :type file: str
+
+    :param units: Dictionary with unit description per signal name
+    :type units: dict
 
+    :param dtypes: Dictionary with the data types with which the data should be saved
+    :type dtypes: dict
+
+    :param global_attributes: Attributes to add to the top level
+    :type global_attributes: dict
+
+    :param compression: Compression filter for floating point datasets (see :py:func:`save_data`)
+    :type compression: str
+
+    :param compression_opts: Options for the compression filter
+    :type compression_opts: int
+
+    :param chunk_bytes: Target chunk size in bytes (see :py:func:`save_data`)
+    :type chunk_bytes: int
+
+    :returns: A writer, usable as a context manager, with an ``append(data)`` method
+              that appends a dictionary of chunks and a ``close()`` method
+    :rtype: _StreamWriter
+    """
+    fname = file if file.endswith('.hdf') else file + '.hdf'
+    try:
+        # No paged allocation here: the total data size is unknown up front, so a page
+        # size large enough for big streams would pad small files by whole pages.
+        # The large chunk cache (rdcc_nbytes) helps when extending compressed chunks.
+        hdf = h5py.File(fname, 'w', libver='latest', rdcc_nbytes=16*1024*1024)
+    except TypeError:
+        hdf = h5py.File(fname, 'w')
+    if global_attributes is not None:
+        for key in global_attributes:
+            value = global_attributes[key]
+            hdf.attrs[key] = np.bytes_(str2ascii(value)) if isinstance(value, str) else value
+    return _StreamWriter(hdf, units, dtypes, compression, compression_opts, chunk_bytes)
 
 
 def join_data(file, subfiles):
@@ -85,7 +297,33 @@ def estimate_lines(file):
     return estimated_lines
 
 
-def get_data(file, max_lines=None, start_line=0):
+def count_scans(file):
+    """ Count the exact number of data points (scans) in the xml file by a cheap
+    binary pass, allowing output buffers to be sized exactly up front.
+
+    :param file: Path to xml file
+    :type file: str
+
+    :returns: The number of ``<Scan>`` entries in the file
+    :rtype: int
+    """
+    fname = file if file.endswith('.xml') else file + '.xml'
+    num_scans = 0
+    tail = b""
+    with open(fname, 'rb') as xml:
+        while True:
+            block = xml.read(1 << 24)
+            if not block:
+                break
+            # Prepend the last bytes of the previous block so that tags
+            # straddling a block boundary are counted as well
+            buf = tail + block
+            num_scans += buf.count(b"<Scan>")
+            tail = buf[-5:]
+    return num_scans
+
+
+def get_data(file, max_lines=None, start_line=0, signals=None):
     """ Get data from the biaxial machine's raw xml file.
 
     :param file: Path to xml file
@@ -94,73 +332,408 @@ def get_data(file, max_lines=None, start_line=0):
     :param max_lines: Max "line number" (i.e. datapoints) to read from xml file.
                       Defaults to None, meaning read until the end
     :type max_lines: int
-    
-    :param start_line: Which line (time step number) to start at. Useful to get data in parts for large files. 
-    :type start_line: int 
+
+    :param start_line: Which line (time step number) to start at. Useful to get data in parts for large files.
+    :type start_line: int
+
+    :param signals: Names of the signals to read, skipping the remaining columns to save time
+                    and memory (see :py:func:`reduced_signal_names`).
+                    Defaults to None, meaning read all signals
+    :type signals: set (or other iterable)
 
     :returns: Dictionary with key based on names in the xml file and content as numpy arrays (float64)
               Dictionary with key based on names in the xml file and content strings with unit description
     :rtype: dict, dict
     """
     fname = file if file.endswith('.xml') else file + '.xml'
+    return _collect_chunks(_iter_chunks(fname, None, max_lines, start_line, signals))
+
+
+def iter_data(file, chunk_rows=1000000, max_lines=None, start_line=0, signals=None):
+    """ Stream data from the biaxial machine's raw xml file in chunks.
+
+    Like :py:func:`get_data`, but instead of returning the complete arrays the data is
+    handed over in chunks of at most ``chunk_rows`` scans, so a pipeline that processes
+    and writes chunk by chunk (see :py:func:`open_writer`) holds only a few chunks in
+    memory at a time.
+
+    :param file: Path to xml file
+    :type file: str
+
+    :param chunk_rows: Maximum number of scans per yielded chunk
+    :type chunk_rows: int
+
+    :param max_lines: Max "line number" (i.e. datapoints) to read (see :py:func:`get_data`)
+    :type max_lines: int
+
+    :param start_line: Which line (time step number) to start at (see :py:func:`get_data`)
+    :type start_line: int
+
+    :param signals: Names of the signals to read (see :py:func:`get_data`)
+    :type signals: set (or other iterable)
+
+    :returns: A generator. The first item is ``(names, units)`` with the signal names
+              that will be read and their unit strings. Each following item is
+              ``(row_offset, data)``, where data maps the signal names to float64
+              arrays holding the scans starting at row_offset.
+    :rtype: generator
+    """
+    fname = file if file.endswith('.xml') else file + '.xml'
+    return _iter_chunks(fname, chunk_rows, max_lines, start_line, signals)
+
+
+def _iter_chunks(fname, chunk_rows, max_lines, start_line, signals):
+    # Dispatch to the fastest available chunked parser. Both generators yield
+    # (kept_names, units) first, followed by (row_offset, {name: values}) chunks of at
+    # most chunk_rows rows each (a single exactly sized chunk when chunk_rows is None).
+    if etree is not None:
+        return _iter_data_lxml(fname, chunk_rows, max_lines, start_line, signals)
+    return _iter_data_bytes(fname, chunk_rows, max_lines, start_line, signals)
+
+
+def _collect_chunks(chunks):
+    # Assemble the chunk stream from _iter_chunks into the (data, units) dictionaries
+    # returned by get_data. With chunk_rows=None there is exactly one chunk per signal,
+    # so no concatenation copy is made.
+    kept_names, units = next(chunks)
+    parts = {name: [] for name in kept_names}
+    for _, chunk in chunks:
+        for name in kept_names:
+            parts[name].append(chunk[name])
+    data = {name: (parts[name][0] if len(parts[name]) == 1 else np.concatenate(parts[name]))
+            for name in kept_names}
+    return data, units
+
+
+def _column_filter(names, signals):
+    # Map the signal index in the file to the output buffer index (-1: don't store),
+    # keeping only the requested signals (all if signals is None)
+    keep = [True]*len(names) if signals is None else [name in signals for name in names]
+    colmap = []
+    num_kept = 0
+    for keep_col in keep:
+        colmap.append(num_kept if keep_col else -1)
+        num_kept += 1 if keep_col else 0
+    kept_names = [name for name, keep_col in zip(names, keep) if keep_col]
+    return colmap, kept_names
+
+
+def _iter_data_lxml(fname, chunk_rows=None, max_lines=None, start_line=0, signals=None):
+    # Streaming lxml parser generator. The xml is parsed in C by lxml.etree.iterparse and the
+    # values are written directly into preallocated numpy buffers, avoiding per-line string
+    # splitting and the list-append/np.array copy of the line-based parser.
+    # Yields (kept_names, units) once the signal list is read, then (row_offset, {name: values})
+    # chunks of at most chunk_rows rows (a single exactly sized chunk when chunk_rows is None).
     if max_lines is None:
-        estimated_lines = estimate_lines(fname)
         max_lines = np.inf
+        # Exact count so single-chunk buffers are sized correctly; in chunked mode the
+        # count is only used for the progress print, so the cheap estimate suffices
+        estimated_lines = estimate_lines(fname) if chunk_rows else count_scans(fname)
     else:
         estimated_lines = max_lines
 
-    with open(fname, 'r') as xml:
-        # Read until signal description list starts
-        for line in xml:
-            if line.strip() == "<Signals>":
-                break
-        # Acquire signal names and units
-        names = []
-        units = {}
-        for line in xml:
-            if line.strip() == "</Signals>":
+    # Signal descriptions, column filtering and output buffers are set up on the fly when the
+    # corresponding elements appear in the stream (the signal list precedes the data)
+    names = []
+    units = {}
+    colmap = []
+    kept_names = []
+    bufs = []
+    num_signals = 0
+    num_guess = chunk_rows if chunk_rows else max(1024, int(estimated_lines - start_line) + 1)
+    keep_from = max(start_line, 1)
+    name_ind = 0
+    row_count = 0       # Scans seen (including skipped ones)
+    rows_done = 0       # Complete rows stored in bufs
+    offset = 0          # Rows already handed over in earlier chunks
+    header_sent = False
+    storing = False
+    with open(fname, 'rb') as xml:
+        # A single pass over the file handles the signal description list and the data
+        context = etree.iterparse(xml, events=("start", "end"), tag=("Signal", "Signals", "Scan", "Value"))
+        try:
+            for event, elem in context:
+                tag = elem.tag
+                if tag == "Value":
+                    if event == "end":
+                        if storing:
+                            col = colmap[name_ind]
+                            try:
+                                if col >= 0:
+                                    bufs[col][rows_done] = float(elem.text)
+                            except (TypeError, ValueError):
+                                print("Could not convert a data value, could be due to partial file?")
+                                break
+                            name_ind += 1
+                            if name_ind == num_signals:
+                                rows_done += 1
+                                name_ind = 0
+                        elem.clear()
+                elif tag == "Scan":
+                    if event == "start":
+                        row_count += 1
+                        name_ind = 0
+                        # Cut off before the storing decision, matching the fallback parser,
+                        # where scans consumed by the start_line skip are exempt from the check
+                        if row_count > start_line and row_count >= max_lines:
+                            break
+                        storing = row_count >= keep_from
+                        if storing and bufs and rows_done >= len(bufs[0]):
+                            if chunk_rows:
+                                # Hand the filled chunk over and start on a fresh one
+                                yield offset, {name: buf for name, buf in zip(kept_names, bufs)}
+                                offset += rows_done
+                                rows_done = 0
+                                bufs = [np.empty(chunk_rows, dtype=np.float64) for _ in kept_names]
+                            else:
+                                # Grow buffers by doubling (amortized constant cost per row)
+                                bufs = [np.resize(buf, 2 * len(buf)) for buf in bufs]
+                        if row_count % 100000 == 0:
+                            progress = 100 * (row_count - start_line) / (estimated_lines - start_line)
+                            sys.stdout.write("\rEstimated progress: {:5.1f} %".format(progress))
+                            sys.stdout.flush()
+                    else:               # </Scan>: release parsed elements to keep memory O(1)
+                        elem.clear()
+                        while elem.getprevious() is not None:
+                            del elem.getparent()[0]
+                elif tag == "Signal":
+                    if event == "end":
+                        name = elem.get("InternalName") or elem.get("Name")
+                        names.append(name)
+                        # Encode to ascii once here, so downstream code never re-encodes
+                        units[name] = str2ascii(elem.get("Unit"))
+                        elem.clear()
+                elif event == "end":    # </Signals>: signal list complete, set up the output buffers
+                    colmap, kept_names = _column_filter(names, signals)
+                    num_signals = len(names)
+                    bufs = [np.empty(num_guess, dtype=np.float64) for _ in kept_names]
+                    yield kept_names, {name: units[name] for name in kept_names}
+                    header_sent = True
+        except etree.XMLSyntaxError:
+            print("Could not parse the full xml file, could be due to partial file?")
+    print('\n')
+    if name_ind != 0:
+        print("Last data point not completely read, is the file complete?")
+
+    print("Total number of lines: ", offset + rows_done)
+    if not header_sent:     # No signal list found (e.g. empty or truncated header)
+        yield kept_names, {name: units[name] for name in kept_names}
+    yield offset, {name: buf[:rows_done] for name, buf in zip(kept_names, bufs)}
+
+
+def _convert_scan_batch(batch_vals, pending, num_signals):
+    # Convert the accumulated value substrings of `pending` complete scans to a
+    # (pending, num_signals) float array in one numpy call. On a conversion failure
+    # (e.g. a partial file), salvage the leading scans that do convert.
+    try:
+        return np.array(batch_vals, dtype=np.float64).reshape(pending, num_signals), False
+    except ValueError:
+        rows = []
+        for i in range(pending):
+            try:
+                rows.append(np.array(batch_vals[i*num_signals:(i + 1)*num_signals], dtype=np.float64))
+            except ValueError:
                 break
-            name, unit = get_name_and_unit(line)
-            names.append(name)
-            units[name] = unit
-        data = {name: [] for name in names}
-        name_ind = 0    # Not actually needed
-        row_count = 0
-        if start_line>0:
-            for line in xml:
-                if line.strip() == "<Scan>":
-                    row_count += 1
-                    if row_count >= start_line:
-                        break
-                        
-        for line in xml:
-            if line.strip().startswith("<Value>"):
-                name = names[name_ind]
-                try:
-                    data[name].append(get_data_value(line, np.float64))
-                except ValueError:
-                    print("Could not convert a data value, could be due to partial file?")
-                    break
-                name_ind += 1
-            elif line.strip() == "<Scan>":
-                name_ind = 0
-                row_count += 1
-                if row_count >= max_lines:
+        print("Could not convert a data value, could be due to partial file?")
+        return np.array(rows, dtype=np.float64).reshape(len(rows), num_signals), True
+
+
+def _iter_data_bytes(fname, chunk_rows=None, max_lines=None, start_line=0, signals=None):
+    # Pure python fallback parser generator, used when lxml is not installed. The file is
+    # memory mapped and walked with C-level byte searches, avoiding the per-line str
+    # decoding and allocation of line iteration. Values are converted in one numpy batch
+    # per scan, as in the previous line-based parser. Yields (kept_names, units) first,
+    # then (row_offset, {name: values}) chunks as described for _iter_chunks.
+    if max_lines is None:
+        max_lines = np.inf
+        # Exact count so single-chunk buffers are sized correctly; in chunked mode the
+        # count is only used for the progress print, so the cheap estimate suffices
+        estimated_lines = estimate_lines(fname) if chunk_rows else count_scans(fname)
+    else:
+        estimated_lines = max_lines
+
+    scan_tag = b"<Scan>"
+    with open(fname, 'rb') as xml:
+        mm = mmap.mmap(xml.fileno(), 0, access=mmap.ACCESS_READ)    # Valid after the file closes
+
+    # Acquire signal names and units from the (small) header, decoded once
+    sig_start = mm.find(b"<Signals>")
+    sig_end = mm.find(b"</Signals>", sig_start)
+    names = []
+    units = {}
+    for tag_match in _SIGNAL_TAG_RE.finditer(mm[sig_start:sig_end].decode()):
+        tag = tag_match.group(0)
+        name_match = _INTERNAL_NAME_RE.search(tag) or _NAME_RE.search(tag)
+        name = name_match.group(1)
+        names.append(name)
+        # Encode to ascii once here, so downstream code never re-encodes
+        units[name] = str2ascii(_UNIT_RE.search(tag).group(1))
+
+    colmap, kept_names = _column_filter(names, signals)
+    kept_cols = [i for i, col in enumerate(colmap) if col >= 0]
+    num_signals = len(names)
+    num_guess = chunk_rows if chunk_rows else max(1024, int(estimated_lines - start_line) + 1)
+    bufs = [np.empty(num_guess, dtype=np.float64) for _ in kept_names]
+    batch_vals = []     # Value substrings of complete scans, converted in large batches
+    pending = 0         # Complete scans accumulated in batch_vals
+    batch_scans = 4096  # Scans per conversion batch, amortizing the numpy call overhead
+    name_ind = 0
+    row_count = 0
+    rows_done = 0
+    offset = 0          # Rows already handed over in earlier chunks
+    yield kept_names, {name: units[name] for name in kept_names}
+
+    def store_batch():
+        # Convert the accumulated batch and copy it into the signal buffers column by
+        # column, growing (single-chunk mode) or completing (chunked mode) buffers as
+        # needed. Returns (full_chunks, truncated): the buffer sets that were filled
+        # completely and should be handed over, and whether a value failed to convert.
+        nonlocal bufs, rows_done, batch_vals, pending
+        mat, truncated = _convert_scan_batch(batch_vals, pending, num_signals)
+        full_chunks = []
+        start = 0
+        while start < len(mat):
+            if bufs and rows_done >= len(bufs[0]):
+                if chunk_rows:
+                    full_chunks.append(bufs)
+                    rows_done = 0
+                    bufs = [np.empty(chunk_rows, dtype=np.float64) for _ in kept_names]
+                else:
+                    # Grow buffers by doubling (amortized constant cost per row)
+                    bufs = [np.resize(buf, 2 * len(buf)) for buf in bufs]
+            space = len(bufs[0]) - rows_done if bufs else len(mat) - start
+            take = min(space, len(mat) - start)
+            for buf, j in zip(bufs, kept_cols):
+                buf[rows_done:rows_done + take] = mat[start:start + take, j]
+            rows_done += take
+            start += take
+        batch_vals = []
+        pending = 0
+        return full_chunks, truncated
+
+    pos = sig_end
+    while row_count < start_line and pos >= 0:
+        pos = mm.find(scan_tag, pos)
+        if pos >= 0:
+            pos += len(scan_tag)
+            row_count += 1
+
+    # One pass of the compiled pattern over the rest of the map yields both values
+    # and scan separators in file order, entirely in the regex C engine
+    for match in _DATA_RE.finditer(mm, pos if pos >= 0 else len(mm)):
+        value = match.group(1)
+        if value is None:
+            # <Scan>: the previous scan joins the batch if it was completely read
+            if name_ind == num_signals:
+                pending += 1
+            else:
+                # Scan without the full signal count: drop its values from the batch
+                del batch_vals[len(batch_vals) - name_ind:]
+            name_ind = 0
+            row_count += 1
+            if pending >= batch_scans:
+                full_chunks, truncated = store_batch()
+                for chunk_bufs in full_chunks:
+                    yield offset, {name: buf for name, buf in zip(kept_names, chunk_bufs)}
+                    offset += chunk_rows
+                if truncated:
                     break
-                if row_count % 100000 == 0:
-                    progress = 100 * (row_count-start_line) / (estimated_lines-start_line)
-                    sys.stdout.write("\rEstimated progress: {:5.1f} %".format(progress))
-                    sys.stdout.flush()
+            if row_count >= max_lines:
+                break
+            if row_count % 100000 == 0:
+                progress = 100 * (row_count-start_line) / (estimated_lines-start_line)
+                sys.stdout.write("\rEstimated progress: {:5.1f} %".format(progress))
+                sys.stdout.flush()
+        else:
+            batch_vals.append(value)
+            name_ind += 1
+    else:
+        # End of file: the last scan joins the batch if it was completely read
+        if name_ind == num_signals:
+            pending += 1
+            name_ind = 0
+    # Store whatever remains in the batch
+    full_chunks, _ = store_batch()
+    for chunk_bufs in full_chunks:
+        yield offset, {name: buf for name, buf in zip(kept_names, chunk_bufs)}
+        offset += chunk_rows
+    mm.close()
     print('\n')
-    if name_ind != len(names) or name_ind != 0:
+    if name_ind != 0:
         print("Last data point not completely read, is the file complete?")
 
-    row_count = np.min([len(data[name]) for name in names])
-    print("Total number of lines: ", row_count)
-    for name in names:
-        data[name] = np.array(data[name])[:row_count]
+    print("Total number of lines: ", offset + rows_done)
+    yield offset, {name: buf[:rows_done] for name, buf in zip(kept_names, bufs)}
 
-    return data, units
+
+def stream_to_hdf5(file, out_file=None, chunk_rows=1000000, signals=None,
+                   compression='lzf', compression_opts=None):
+    """ Convert the raw xml data directly to an hdf5 file, without holding the full
+    dataset in memory.
+
+    The parser runs in a background thread that hands chunks of ``chunk_rows`` scans
+    through a bounded queue to the hdf5 writer in the calling thread. Both the xml
+    parsing and the compressed hdf5 writing release the GIL around their C work, so
+    the two phases overlap on a multicore machine, and the peak memory use is a few
+    chunks instead of the full dataset.
+
+    :param file: Path to xml file
+    :type file: str
+
+    :param out_file: Path of the hdf5 file to write (suffix optional).
+                     Defaults to ``file`` with the suffix replaced by .hdf
+    :type out_file: str
+
+    :param chunk_rows: Number of scans per chunk handed from the parser to the writer
+    :type chunk_rows: int
+
+    :param signals: Names of the signals to read (see :py:func:`get_data`)
+    :type signals: set (or other iterable)
+
+    :param compression: Compression filter for the datasets (see :py:func:`save_data`)
+    :type compression: str
+
+    :param compression_opts: Options for the compression filter
+    :type compression_opts: int
+
+    :returns: The name of the written hdf5 file
+    :rtype: str
+
+    The data is written as parsed (float64, with the names and units from the xml
+    file). Use :py:func:`get_data` followed by :py:func:`reduce_data` when the
+    reduced in-memory format is wanted instead.
+    """
+    fname = file if file.endswith('.xml') else file + '.xml'
+    if out_file is None:
+        out_file = file[:-4] if file.endswith('.xml') else file
+    out_name = out_file if out_file.endswith('.hdf') else out_file + '.hdf'
+
+    chunks = _iter_chunks(fname, chunk_rows, None, 0, signals)
+    kept_names, units = next(chunks)    # Header is parsed before the threads start
+
+    fifo = queue.Queue(maxsize=2)   # Bounded, so the parser stays at most ~2 chunks ahead
+
+    def produce():
+        try:
+            for item in chunks:
+                fifo.put(item)
+            fifo.put(None)
+        except BaseException as err:    # Re-raised in the writing thread below
+            fifo.put(err)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    with open_writer(out_name, units, compression=compression, compression_opts=compression_opts) as writer:
+        while True:
+            item = fifo.get()
+            if item is None:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            _, data = item
+            writer.append(data)
+    producer.join()
+    return out_name
 
 
 def get_name_and_unit(line):
@@ -168,16 +741,18 @@ def get_name_and_unit(line):
 
     ``<Signal Name="Running Time" InternalName="Running Time" Dimension="time" Unit="sec" />\\n``
 
+    The InternalName attribute is used (falling back to Name if it is absent), since
+    that is the key that :py:func:`reduce_data` expects.
+
     :param line: The line in the xml file
     :type line: str
 
     :returns: name, unit
     :rtype: str, str
     """
-    name = line.split("Name=")[-1].split('"')[1]
-    unit = line.split("Unit=")[-1].split('"')[1]
+    name_match = _INTERNAL_NAME_RE.search(line) or _NAME_RE.search(line)
 
-    return name, unit
+    return name_match.group(1), _UNIT_RE.search(line).group(1)
 
 
 def get_data_value(line, dtype):
@@ -195,12 +770,71 @@ def get_data_value(line, dtype):
     :rtype: dtype
 
     """
-    value = line.split("<Value>")[-1].split("</Value>")[0]
-    return dtype(value)
+    # The value layout is rigid, so two C-level find calls and a slice beat both
+    # the str.split chain and a regex search
+    start = line.find("<Value>")
+    if start >= 0:
+        start += 7      # len("<Value>")
+        end = line.find("<", start)
+        if end > start:
+            return dtype(line[start:end])
+    # E.g. a truncated line in a partial file
+    raise ValueError("No complete value found in line: " + line)
+
+
+# Mapping from output keys to the signal names used in the machine's xml files
+SENSOR_KEYS = {"forc": "Axial Force",
+               "torq": "Torsional Torque",
+               "astr": "Axial Strain",
+               "tstr": "Torsional Strain (ang)"}
+DISP_KEYS = {"disp": "Axial Displacement",
+             "rota": "Torsional Rotation"}
+CNT_KEYS = {"acnt": "Axial Segment Count",
+            "tcnt": "Torsional Segment Count"}
+TIME_KEY = "Running Time"
+
+
+def reduced_signal_names(save_disp=False, use_tcnt=False, join_cnt=False):
+    """ Get the raw signal names that :py:func:`reduce_data` uses for the given options.
+    Passing this set as ``signals`` to :py:func:`get_data` skips parsing and storing the
+    unused columns, saving both time and memory.
+
+    :param save_disp: As for :py:func:`reduce_data`
+    :type save_disp: bool
+
+    :param use_tcnt: As for :py:func:`reduce_data`
+    :type use_tcnt: bool
+
+    :param join_cnt: As for :py:func:`reduce_data`
+    :type join_cnt: bool
+
+    :returns: The signal names required by :py:func:`reduce_data`
+    :rtype: set
+    """
+    names = set(SENSOR_KEYS.values())
+    names.add(TIME_KEY)
+    if save_disp:
+        names.update(DISP_KEYS.values())
+    names.add(CNT_KEYS["acnt"])
+    if use_tcnt or join_cnt:
+        names.add(CNT_KEYS["tcnt"])
+    return names
+
+
+def _cnt_steps(c_changes, change_vals, first_val):
+    # Build the counter index array: element 2*c gives the data index when the
+    # counter changed to c (half counters are used as well, hence the factor 2)
+    cnt = [0]
+    for c_change, change_val in zip(c_changes, change_vals):
+        change_to = int(2*(change_val - first_val))
+        while len(cnt) < (change_to-1):
+            cnt.append(cnt[-1])
+        cnt.append(c_change+1)
+    return np.array(cnt, dtype=np.uint32)       # OK up to 4e9 datapoints
 
 
 def reduce_data(raw_data, raw_units, save_disp=False, use_tcnt=False,
-                sensor_dtype=np.float32, time_accuracy=1.e-4, cnt_tol=0.1):
+                sensor_dtype=np.float32, time_accuracy=1.e-4, cnt_tol=0.1, join_cnt=False):
     """ Reduce the amount of data stored by
 
     1) Choose appropriate datatypes for sensor values
@@ -230,10 +864,15 @@ def reduce_data(raw_data, raw_units, save_disp=False, use_tcnt=False,
     :param cnt_tol: The minimum counter change required to detect new count
     :type cnt_tol: float
 
+    :param join_cnt: Save a single counter "cnt" based on the sum of the axial and torsional
+                     segment counts (requires both to be present). Defaults to False
+    :type join_cnt: bool
+
     :returns: (data, units, dtype)
               data: New dictionary with keys "forc", "torq", "astr", "tstr",
-              "disp", "rota", "time", ["cnt" or ("acnt", "tcnt")] whichever is available. Note that only the data in
-              the counters are modified, otherwise no conversion from the machine data is performed.
+              "disp", "rota", "time", ["cnt" or ("acnt", "tcnt")] whichever is available. Note that the counters
+              are converted to index arrays and the sensor values are cast to sensor_dtype, otherwise no
+              conversion from the machine data is performed.
               units: Unit strings (converted to ascii characters to avoid strange unicode issues)
               dtype: The datatype with which the data should be stored.
     :rtype: (dict, dict, dict)
@@ -242,48 +881,51 @@ def reduce_data(raw_data, raw_units, save_disp=False, use_tcnt=False,
     units = {}
     dtypes = {}
     # Save sensor values (load and strains)
-    sensor_keys = {"forc": "Axial Force",
-                   "torq": "Torsional Torque",
-                   "astr": "Axial Strain",
-                   "tstr": "Torsional Strain (ang)"}
+    sensor_keys = SENSOR_KEYS
     for skey in sensor_keys:
-        if sensor_keys[skey] in raw_data:
-            data[skey] = raw_data[sensor_keys[skey]]
+        rkey = sensor_keys[skey]
+        if rkey in raw_data:
+            # Cast to the storage dtype already here: halves the memory and bandwidth
+            # for the rest of the pipeline instead of converting during the hdf5 write
+            data[skey] = np.ascontiguousarray(raw_data[rkey], dtype=sensor_dtype)
             dtypes[skey] = sensor_dtype
-            units[skey] = str2ascii(raw_units[sensor_keys[skey]])
+            units[skey] = raw_units[rkey]   # Already ascii-encoded by get_data
 
     # Save displacements (if requested)
-    disp_keys = {"disp": "Axial Displacement",
-                 "rota": "Torsional Rotation"}
+    disp_keys = DISP_KEYS
     if save_disp:
         for dkey in disp_keys:
-            if disp_keys[dkey] in raw_data:
-                data[dkey] = raw_data[disp_keys[dkey]]
+            rkey = disp_keys[dkey]
+            if rkey in raw_data:
+                data[dkey] = np.ascontiguousarray(raw_data[rkey], dtype=sensor_dtype)
                 dtypes[dkey] = sensor_dtype
-                units[dkey] = str2ascii(raw_units[disp_keys[dkey]])
+                units[dkey] = raw_units[rkey]   # Already ascii-encoded by get_data
 
     # Save counter information
     # Want a vector that returns the index when we change ?cnt by giving 2x the value we change to
     # 2x because half counters are used as well.
-    cnt_keys = {"acnt": "Axial Segment Count"}
-    if use_tcnt:
-        cnt_keys["tcnt"] = "Torsional Segment Count"
-
-    for ckey in cnt_keys:
-        raw_cnt = raw_data[cnt_keys[ckey]]
-        c_changes = np.where(raw_cnt[1:] > (raw_cnt[:-1] + cnt_tol))[0]
-        cnt = [0]
-        for c_change in c_changes:
-            change_to = int(2*(raw_cnt[c_change+1]-raw_cnt[0]))
-            while len(cnt) < (change_to-1):
-                cnt.append(cnt[-1])
-            cnt.append(c_change+1)
-        data[ckey] = np.array(cnt, dtype=np.uint32)     # OK up to 4e9 datapoints
-        dtypes[ckey] = np.uint32
-        units[ckey] = "-"
+    if join_cnt:
+        acnt = raw_data[CNT_KEYS["acnt"]]
+        tcnt = raw_data[CNT_KEYS["tcnt"]]
+        c_changes = _find_cnt_changes_sum(acnt, tcnt, cnt_tol)
+        # The joined counter values are only needed at the (few) change points
+        data["cnt"] = _cnt_steps(c_changes, acnt[c_changes+1] + tcnt[c_changes+1], acnt[0] + tcnt[0])
+        dtypes["cnt"] = np.uint32
+        units["cnt"] = "-"
+    else:
+        cnt_keys = {"acnt": CNT_KEYS["acnt"]}
+        if use_tcnt:
+            cnt_keys["tcnt"] = CNT_KEYS["tcnt"]
+
+        for ckey in cnt_keys:
+            raw_cnt = raw_data[cnt_keys[ckey]]
+            c_changes = _find_cnt_changes(raw_cnt, cnt_tol)
+            data[ckey] = _cnt_steps(c_changes, raw_cnt[c_changes+1], raw_cnt[0])
+            dtypes[ckey] = np.uint32
+            units[ckey] = "-"
 
     # Save time
-    trkey = "Running Time"
+    trkey = TIME_KEY
     tkey = "time"
     if trkey in raw_data:
         data[tkey] = raw_data[trkey]
@@ -332,12 +974,13 @@ def compensate(data, units, outer_diameter, tstr_sign=0):
     if tstr_sign == 0 and 'tstr' in data:
         # Remove last 10 % when looking max min to avoid evaluating after failure.
         n = int(data['tstr'].shape[0]*0.9)
+        torq = data['torq'][:n]
+        tstr = data['tstr'][:n]
         # Find max and min torque
-        i_max = np.argmax(data['torq'][:n])
-        i_min = np.argmin(data['torq'][:n])
+        i_max = np.argmax(torq)
+        i_min = np.argmin(torq)
         # Get sign of inclination for torque versus shear strain. If positive maintain sign versus torque.
-        tsgn = np.sign((data['torq'][i_max] - data['torq'][i_min]) /
-                       (data['tstr'][i_max] - data['tstr'][i_min]))
+        tsgn = np.sign((torq[i_max] - torq[i_min]) / (tstr[i_max] - tstr[i_min]))
     else:
         tsgn = tstr_sign
 
@@ -362,13 +1005,13 @@ def compensate(data, units, outer_diameter, tstr_sign=0):
                     print("Available units are: {:s}".format(",".join(['"' + u + '"' for u in scale_factors[key]])))
                     print("Consider adding additional unit conversions to 'scale_factors' (see above in the code)")
                 raise ke
-            data[key] = sfac * data[key]
+            np.multiply(data[key], sfac, out=data[key])     # In place, no scaled copy per channel
 
-    # Compensate for machine stiffness
+    # Compensate for machine stiffness (multiply by reciprocal stiffness, subtract in place)
     if 'disp' in data:
-        data['disp'] -= data['forc']/k_axial
+        data['disp'] -= data['forc']*(1.0/k_axial)
     if 'rota' in data:
-        data['rota'] -= data['torq']/k_torsional
+        data['rota'] -= data['torq']*(1.0/k_torsional)
     stiffness_comp = ''
     if any([c in data for c in ['disp', 'rota']]):
         stiffness_comp = 'Machine stiffness compensation:\n'
@@ -378,8 +1021,9 @@ def compensate(data, units, outer_diameter, tstr_sign=0):
     # Compensate for cross talk
     data['torq'] -= data['forc']*torque_per_force
 
-    # Write modified units
-    new_units = {key: (fixed_units[key] if key in fixed_units else units[key]) for key in data}
+    # Write modified units: start from the input units and overwrite the scaled channels
+    new_units = units.copy()
+    new_units.update({key: fixed_units[key] for key in data if key in fixed_units})
 
     info = (''
             + 'Rotation (torq,rota) reversed from machine\n'
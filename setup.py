@@ -1,9 +1,20 @@
-from distutils.core import setup
+from setuptools import setup
 
-#  Generate requirement list from requirements.txt file
+# Generate requirement lists from requirements.txt. The "Optional" sections hold
+# import-guarded accelerators (lxml, numba, pandas) with pure numpy/stdlib fallbacks
+# in the code, so they become a pip extra instead of hard requirements: a plain
+# `pip install .` stays lightweight, and `pip install .[fast]` pulls them in.
 req = []
+fast = []
+optional = False
 with open('requirements.txt', 'r') as fid:
-    req = [line for line in fid if not line.strip().startswith('#')]
+    for line in fid:
+        stripped = line.strip()
+        if stripped.startswith('#'):
+            optional = stripped.lstrip('#').strip().lower().startswith('optional')
+            continue
+        if stripped:
+            (fast if optional else req).append(stripped)
 
 # Call setup command to make installable by pip install .
 setup(name='cth_mts_biax',
@@ -13,5 +24,6 @@ setup(name='cth_mts_biax',
       author_email='',
       url='',
       packages=['cth_mts_biax'],
-      install_requires=req
+      install_requires=req,
+      extras_require={'fast': fast}
      )